@@ -1,5 +1,8 @@
 # workflow:
 # - extract all pixel blocks (1x1 rect) from SVG
+#    - bigger rects are split into 1x1 pixels
+#      (positions and sizes are snapped to whole pixels, every rect is at least 1x1)
+#      (src/optimise-pixels.py also scales upscaled art down before tracing, see src/PixelGrid.py)
 # - group them by colour (this is for performance optimisation)
 # - detect boundaries and separate into chunks
 # - plot chunk edges
@@ -11,16 +14,22 @@
 #       - write SVG path
 # - sort svg tags by "x" and "y" coordinates
 # - enclose with SVG opening/closing tags
+# - write back to file (gzipped if the input was .svgz / .svg.gz, or with --gzip)
 
-import sys
 import os.path
 import xml.etree.ElementTree as ET 
 import re
+import gzip
+import argparse
+from math import floor
 
 def main():
-	filename = get_filename()
-	tree = ET.parse(filename)
+	args = get_arguments()
+	filename = get_filename(args.filename)
+	with open_svg(filename) as svg_file:
+		tree = ET.parse(svg_file)
 	root = tree.getroot()
+	pixels = {}
 	pixel_groups = {}
 
 	# recycle viewbox if possible
@@ -55,8 +64,10 @@ def main():
 
 	for item in root.findall(".//svg:rect", ns_array):
 		attr = item.attrib
-		x = int(attr["x"] if "x" in attr else 0)
-		y = int(attr["y"] if "y" in attr else 0)
+		x = snap(float(attr["x"] if "x" in attr else 0))
+		y = snap(float(attr["y"] if "y" in attr else 0))
+		width = max(1, snap(float(attr["width"] if "width" in attr else 1)))
+		height = max(1, snap(float(attr["height"] if "height" in attr else 1)))
 
 		colour = None
 		if "fill" in attr:
@@ -70,9 +81,19 @@ def main():
 		if colour == None:
 			continue
 
+		# a bigger rect covers more than 1 pixel
+		# the last rect drawn on a pixel is the one we see
+		for py in range(y, y + height):
+			for px in range(x, x + width):
+				pixels[(px, py)] = colour
+
+	# group by colour, in the order the colours first show up top-down left-to-right
+	# so that the output doesn't depend on the order of the rects in the input
+	for pixel in sorted(pixels, key=lambda p:(p[1], p[0])):
+		colour = pixels[pixel]
 		if not colour in pixel_groups:
 			pixel_groups[colour] = set()
-		pixel_groups[colour].add((x, y))
+		pixel_groups[colour].add(pixel)
 
 	# convert PixelBanks to chunks of pixels
 	for colour in pixel_groups:
@@ -93,8 +114,12 @@ def main():
 			edge_maps[colour].append(polygons)
 
 		# sort the chunks by y then x (to appear nicely in svg)
-		edge_maps[colour].sort(key=lambda chunk:min([polygon["left"] for polygon in chunk]))
-		edge_maps[colour].sort(key=lambda chunk:min([polygon["top"] for polygon in chunk]))
+		# then by the points, so chunks at the same spot never swap places
+		edge_maps[colour].sort(key=lambda chunk:(
+			min([polygon["top"] for polygon in chunk]),
+			min([polygon["left"] for polygon in chunk]),
+			[polygon["points"] for polygon in chunk]
+		))
 
 	"""
 	current state:
@@ -131,13 +156,25 @@ def main():
 	print(svg_content)
 
 	# overwrite file
-	svg_rewrite = open(filename, "w")
-	svg_rewrite.write(svg_content)
+	# compressed input stays compressed, plain input only gets compressed on request
+	if is_gzip_filename(filename) or args.gzip:
+		write_svg(get_gzip_filename(filename), svg_content, args.gzip_level)
+	else:
+		write_svg(filename, svg_content)
+
+
+def get_arguments():
+	parser = argparse.ArgumentParser(description="Optimise pixel art SVG made of 1x1 <rect /> into paths")
+	parser.add_argument("filename", nargs="?", help="svg, svgz or svg.gz file to optimise")
+	parser.add_argument("-z", "--gzip", action="store_true", help="write gzipped output (.svgz)")
+	parser.add_argument("--gzip-level", type=int, default=9, choices=range(1, 10), metavar="1-9", help="gzip compression level (default: 9)")
+	return parser.parse_args()
 
 
-def get_filename():
-	filename = sys.argv[1] if len(sys.argv) == 2 else input("File name? ")
-	if not filename.endswith(".svg"):
+def get_filename(filename = None):
+	if filename == None:
+		filename = input("File name? ")
+	if not filename.endswith(".svg") and not is_gzip_filename(filename):
 		filename = filename + ".svg"
 	
 	if not os.path.isfile(filename):
@@ -147,6 +184,44 @@ def get_filename():
 	return filename
 
 
+def is_gzip_filename(filename):
+	return filename.endswith(".svgz") or filename.endswith(".svg.gz")
+
+
+# "icon.svg" -> "icon.svgz", compressed names are kept as they are
+def get_gzip_filename(filename):
+	if is_gzip_filename(filename):
+		return filename
+	return filename[:-len(".svg")] + ".svgz"
+
+
+# returns a binary stream of the svg, decompressing on the fly if it's gzipped
+# (sniff the magic bytes instead of trusting the extension)
+def open_svg(filename):
+	with open(filename, "rb") as svg_file:
+		magic = svg_file.read(2)
+	if magic == b"\x1f\x8b":
+		return gzip.open(filename, "rb")
+	return open(filename, "rb")
+
+
+# mtime=0 and an empty embedded filename keep the gzip header reproducible
+def write_svg(filename, svg_content, compress_level = None):
+	with open(filename, "wb") as svg_file:
+		if compress_level == None:
+			svg_file.write(svg_content.encode("utf-8"))
+			return
+
+		with gzip.GzipFile(filename="", mode="wb", fileobj=svg_file, compresslevel=compress_level, mtime=0) as gzip_file:
+			gzip_file.write(svg_content.encode("utf-8"))
+
+
+# to the nearest whole number, halves always go up
+# (round() takes halves to the even number, so 1.5 and 2.5 would both end up on 2)
+def snap(value):
+	return floor(value + 0.5)
+
+
 def precalculate(polygon):
 	x = [p[0] for p in polygon]
 	y = [p[1] for p in polygon]
@@ -192,9 +267,14 @@ def group_pixels(pixels):
 	groups = []
 
 	# loop until all pixels are processed
-	while len(pixels):
-		# pop a random pixel then start flooding to all edges
-		frontier = [pixels.pop()]
+	# seeding top-down left-to-right, so the chunks come out in the same order every time
+	for seed in sorted(pixels, key=lambda p:(p[1], p[0])):
+		if seed not in pixels:
+			continue
+
+		# take the pixel then start flooding to all edges
+		pixels.remove(seed)
+		frontier = [seed]
 		group = set()
 
 		# I'm using a queue here because BFS feels more like 'flooding'
@@ -233,6 +313,13 @@ def group_pixels(pixels):
 	return groups
 
 
+# rotate the polygon so that it starts from the top-left most point
+# (keeping the direction)
+def start_from_top_left(polygon):
+	start = polygon.index(min(polygon, key=lambda p:(p[1], p[0])))
+	return polygon[start:] + polygon[:start]
+
+
 class EdgeMap:
 	def __init__(self, from_pixels):
 		self.lines = list()
@@ -283,8 +370,11 @@ class EdgeMap:
 			print(row)
 
 	# trace the lines to generate polygons from the chunk
+	# the lines are sorted top-down left-to-right first, so the same chunk is always
+	# traced the same way no matter what order its edges were found in
 	def generate_polygon(self):
 		lines = self.lines
+		lines.sort(key=lambda line:(line[0][1], line[0][0], line[1][1], line[1][0]))
 		
 		# start depth first search
 		polygons = list()
@@ -322,7 +412,7 @@ class EdgeMap:
 					
 					if is_clockwise(polygon):
 						polygon.reverse()
-					polygons.append(polygon)
+					polygons.append(start_from_top_left(polygon))
 					explored_dots.remove(dot)
 					continue
 
@@ -342,6 +432,7 @@ class EdgeMap:
 
 				explored_dots.add(dot)
 
+		polygons.sort(key=lambda polygon:[(p[1], p[0]) for p in polygon])
 		return polygons
 	
 
@@ -356,8 +447,10 @@ def get_svg_path(polygons, colour):
 		points = polygon["points"]
 
 		# reverse points (make it counter-clockwise) if it's a cutout
+		# (still starting from the same point)
 		if polygon["left"] != left_most or polygon["top"] != top_most:
 			points.reverse()
+			points.insert(0, points.pop())
 
 		path = ""
 		last_point = points[-1]
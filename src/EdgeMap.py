@@ -8,6 +8,13 @@ def is_clockwise(polygon):
 	return result < 0
 
 
+# rotate the polygon so that it starts from the top-left most point
+# (keeping the direction)
+def start_from_top_left(polygon):
+	start = polygon.index(min(polygon, key=lambda p:(p[1], p[0])))
+	return polygon[start:] + polygon[:start]
+
+
 class EdgeMap:
 	def __init__(self, from_pixels):
 		self.lines = list()
@@ -37,6 +44,13 @@ class EdgeMap:
 					self.lines.remove(line)
 				else:
 					self.lines.append(line)
+
+	# for when the edges are already known (see PlanarMap)
+	@classmethod
+	def from_lines(cls, lines):
+		edge_map = cls([])
+		edge_map.lines = list(lines)
+		return edge_map
 	
 	# this is to illustrate the outcome, for debugging purpose
 	def print(self):
@@ -58,8 +72,11 @@ class EdgeMap:
 			print(row)
 
 	# trace the lines to generate polygons from the chunk
+	# the lines are sorted top-down left-to-right first, so the same chunk is always
+	# traced the same way no matter what order its edges were found in
 	def generate_polygon(self):
 		lines = self.lines
+		lines.sort(key=lambda line:(line[0][1], line[0][0], line[1][1], line[1][0]))
 		
 		# start depth first search
 		polygons = list()
@@ -97,7 +114,7 @@ class EdgeMap:
 					
 					if is_clockwise(polygon):
 						polygon.reverse()
-					polygons.append(polygon)
+					polygons.append(start_from_top_left(polygon))
 					explored_dots.remove(dot)
 					continue
 
@@ -117,4 +134,5 @@ class EdgeMap:
 
 				explored_dots.add(dot)
 
+		polygons.sort(key=lambda polygon:[(p[1], p[0]) for p in polygon])
 		return polygons
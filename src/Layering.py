@@ -0,0 +1,77 @@
+# Painter's order layering
+# a colour that is drawn first can cover up its holes, as long as every pixel in the hole
+# gets painted over by the colours drawn after it
+# this turns e.g. a background square with lots of details in it back into a plain square
+
+
+# find the holes of a chunk: groups of empty pixels enclosed by the chunk
+# chunks are 4-connected, so the space around them is 8-connected
+# (a hole that leaks out through a diagonal gap is not a hole)
+def find_holes(chunk):
+	x = [p[0] for p in chunk]
+	y = [p[1] for p in chunk]
+	left, right, top, bottom = (min(x), max(x), min(y), max(y))
+
+	empty = set()
+	for py in range(top, bottom + 1):
+		for px in range(left, right + 1):
+			if (px, py) not in chunk:
+				empty.add((px, py))
+
+	holes = []
+	while len(empty):
+		frontier = [empty.pop()]
+		hole = set()
+		enclosed = True
+
+		while len(frontier):
+			head = frontier.pop()
+			hole.add(head)
+
+			# anything touching the bounding box border leaks to the outside
+			if head[0] in (left, right) or head[1] in (top, bottom):
+				enclosed = False
+
+			for dy in [-1, 0, 1]:
+				for dx in [-1, 0, 1]:
+					neighbour = (head[0] + dx, head[1] + dy)
+					if neighbour in empty:
+						empty.remove(neighbour)
+						frontier.append(neighbour)
+
+		if enclosed:
+			holes.append(hole)
+
+	return holes
+
+
+# returns the chunk with its holes filled up, for the holes that are fully covered
+# returns None if there's nothing to fill
+def fill_covered_holes(chunk, covered):
+	filled = set(chunk)
+	for hole in find_holes(chunk):
+		if hole <= covered:
+			filled |= hole
+
+	if len(filled) == len(chunk):
+		return None
+	return filled
+
+
+# paint the largest colour first, so it has the most chance of being covered by the rest
+def get_layer_order(pixel_groups):
+	area = {}
+	for colour in pixel_groups:
+		area[colour] = sum([len(chunk) for chunk in pixel_groups[colour]])
+	return sorted(pixel_groups, key=lambda colour:-area[colour])
+
+
+# pixels painted after each colour (in layer order)
+def get_covered_pixels(pixel_groups, layer_order):
+	covered = {}
+	painted_after = set()
+	for colour in reversed(layer_order):
+		covered[colour] = set(painted_after)
+		for chunk in pixel_groups[colour]:
+			painted_after |= chunk
+	return covered
@@ -0,0 +1,89 @@
+from fractions import Fraction
+from math import gcd, floor
+
+
+# Upscaled pixel art
+# some exporters draw each pixel as a 10x10 block of 1x1 rects, or as a single rect with width="10"
+# the grid is found from the greatest common divisor of all the positions and sizes
+# so the rects can be turned back into (much fewer) logical pixels first,
+# then the traced shapes are scaled back up to where they were
+#
+# a grid is (pitch, left offset, top offset), e.g. (10, 0, 0)
+
+
+def gcd_fraction(a, b):
+	a, b = (Fraction(a), Fraction(b))
+	return Fraction(gcd(a.numerator * b.denominator, b.numerator * a.denominator), a.denominator * b.denominator)
+
+
+# rects are (x, y, width, height, colour), with Fraction for the numbers
+def detect_grid(rects):
+	if not len(rects):
+		return (1, 0, 0)
+
+	left = min([rect[0] for rect in rects])
+	top = min([rect[1] for rect in rects])
+
+	pitch = 0
+	for x, y, width, height, colour in rects:
+		for value in (x - left, y - top, width, height):
+			pitch = gcd_fraction(pitch, value)
+
+	if pitch == 0:
+		pitch = Fraction(1)
+
+	# one slightly-off number (e.g. x="2.001") pulls the pitch right down to 1/1000
+	# only go with it if it means less pixels than plain 1x1 pixels would
+	# otherwise use 1x1 pixels, still lined up with the top-left rect
+	if pitch < 1 and count_pixels(rects, pitch) > count_pixels(rects, 1):
+		return (1, left % 1, top % 1)
+	return (pitch, left % pitch, top % pitch)
+
+
+# how many logical pixels the rects turn into with this pitch (overlaps counted twice)
+def count_pixels(rects, pitch):
+	return sum([get_size(width, pitch) * get_size(height, pitch) for x, y, width, height, colour in rects])
+
+
+# a rect is always at least 1 pixel wide
+def get_size(size, pitch):
+	return max(1, snap(size / pitch))
+
+
+# to the nearest whole number, halves always go up
+# (round() takes halves to the even number, so 2.5 and 1.5 would both end up on 2)
+def snap(value):
+	return floor(value + Fraction(1, 2))
+
+
+# turns the rects into logical pixels { (x, y): colour }
+# the last rect drawn on a pixel is the one we see
+# (rounded, for the rects that are a bit off the grid)
+def get_pixels(rects, grid):
+	pitch, left, top = grid
+	pixels = {}
+	for x, y, width, height, colour in rects:
+		x = snap((x - left) / pitch)
+		y = snap((y - top) / pitch)
+		for py in range(y, y + get_size(height, pitch)):
+			for px in range(x, x + get_size(width, pitch)):
+				pixels[(px, py)] = colour
+	return pixels
+
+
+def is_unit_grid(grid):
+	return tuple(grid) == (1, 0, 0)
+
+
+# scales a polygon of logical pixels back up
+def scale_polygon(polygon, grid):
+	pitch, left, top = grid
+	return [(x * pitch + left, y * pitch + top) for x, y in polygon]
+
+
+# so that it's written as "10" or "2.5" instead of "Fraction(5, 2)"
+def to_number(value):
+	value = Fraction(value)
+	if value.denominator == 1:
+		return value.numerator
+	return float(value)
@@ -0,0 +1,77 @@
+from EdgeMap import EdgeMap
+
+
+# A single pass over the whole canvas to find the edges of every chunk of every colour
+# instead of building an EdgeMap for each chunk, where every edge between two colours
+# gets discovered twice (once from each side), each segment is found once
+# and handed to the line lists of the chunks on both sides of it
+#
+# every segment also remembers the chunks on its two sides (a half-edge pair),
+# so later passes can ask what's across an edge (see get_sides(), used by --layered)
+class PlanarMap:
+	def __init__(self, pixel_groups):
+		# label each pixel with the chunk it belongs to: (colour, chunk index)
+		# and keep a pixel of each chunk, to tell where the chunk is
+		self.labels = dict()
+		self.pixel_of = dict()
+		for colour in pixel_groups:
+			for index, chunk in enumerate(pixel_groups[colour]):
+				for pixel in chunk:
+					self.labels[pixel] = (colour, index)
+				self.pixel_of[(colour, index)] = min(chunk)
+
+		# lines of each chunk, by label
+		# and the labels on both sides of each segment: { (start, end): (label, other label) }
+		self.lines = dict()
+		self.sides = dict()
+		for label in self.labels.values():
+			self.lines[label] = list()
+
+		# scan top-down left-to-right
+		# a pixel owns its top and left edges, and its bottom and right edges only if
+		# there's no pixel on the other side to own them
+		for pixel in sorted(self.labels, key=lambda p:(p[1], p[0])):
+			x, y = pixel
+			label = self.labels[pixel]
+
+			# the points in these lines are arranged in top-down left-to-right manner (same as EdgeMap)
+			top = self.labels.get((x, y-1))
+			if top != label:
+				self.add_segment([(x, y), (x+1, y)], label, top)
+
+			left = self.labels.get((x-1, y))
+			if left != label:
+				self.add_segment([(x, y), (x, y+1)], label, left)
+
+			if (x+1, y) not in self.labels:
+				self.add_segment([(x+1, y), (x+1, y+1)], label, None)
+
+			if (x, y+1) not in self.labels:
+				self.add_segment([(x, y+1), (x+1, y+1)], label, None)
+
+	# both sides share the same segment, other label is None for the outside
+	def add_segment(self, line, label, other_label):
+		self.sides[tuple(line)] = (label, other_label)
+		self.lines[label].append(line)
+		if other_label != None:
+			self.lines[other_label].append(line)
+
+	# the edges of a single chunk, ready to generate polygons
+	def get_edge_map(self, colour, index):
+		return EdgeMap.from_lines(self.lines[(colour, index)])
+
+	# (label, other label) of a segment, other label is None for the outside
+	def get_sides(self, line):
+		return self.sides[tuple(line)]
+
+	# the edges of a chunk with some of its holes filled up (filled = the chunk plus the hole pixels)
+	# a chunk inside a filled hole is entirely in it, so the edges shared with it are dropped
+	def get_filled_edge_map(self, colour, index, filled):
+		label = (colour, index)
+		lines = list()
+		for line in self.lines[label]:
+			sides = self.get_sides(line)
+			other_label = sides[1] if sides[0] == label else sides[0]
+			if other_label == None or self.pixel_of[other_label] not in filled:
+				lines.append(line)
+		return EdgeMap.from_lines(lines)
@@ -9,8 +9,10 @@ def get_svg_path(polygons, colour):
 		points = polygon["points"]
 
 		# reverse points (make it counter-clockwise) if it's a cutout
+		# (still starting from the same point)
 		if polygon["left"] != left_most or polygon["top"] != top_most:
 			points.reverse()
+			points.insert(0, points.pop())
 
 		path = ""
 		last_point = points[-1]
@@ -47,4 +49,9 @@ def get_svg_path(polygons, colour):
 	return f'<path fill="{colour}" d="{svg_path}"/>'
 
 def get_svg_rect(colour, left, top, width, height, points = []):
-	return f'<rect fill="{colour}" x="{left}" y="{top}" width="{width}" height="{height}"/>'
\ No newline at end of file
+	return f'<rect fill="{colour}" x="{left}" y="{top}" width="{width}" height="{height}"/>'
+
+# '<path fill=...' -> '<path id="..." fill=...'
+def set_tag_id(tag, tag_id):
+	name, attributes = tag.split(" ", 1)
+	return f'{name} id="{tag_id}" {attributes}'
\ No newline at end of file
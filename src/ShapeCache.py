@@ -0,0 +1,106 @@
+import os
+import json
+import hashlib
+from collections import OrderedDict
+
+
+# Remembers the polygons traced from a chunk, so the same shape is only traced once
+# even if it shows up again somewhere else (in another colour, or in another file)
+# shapes are stored relative to their top-left corner, and moved back into place when reused
+#
+# the most recently used shapes are kept in memory (up to max_size)
+# and optionally written to cache_dir, to be shared between runs
+# (in a sub-folder per VERSION, bump it whenever the tracing changes its output)
+class ShapeCache:
+	VERSION = 1
+
+	def __init__(self, max_size = 4096, cache_dir = None):
+		self.shapes = OrderedDict()
+		self.max_size = max_size
+		self.cache_dir = None
+		if cache_dir != None:
+			self.cache_dir = os.path.join(cache_dir, f"v{self.VERSION}")
+		self.hits = 0
+		self.misses = 0
+
+		# no folder, no disk cache (the run goes on with the memory one)
+		if self.cache_dir != None and not os.path.isdir(self.cache_dir):
+			try:
+				os.makedirs(self.cache_dir)
+			except OSError:
+				self.cache_dir = None
+
+	# returns the polygons of a chunk, calling trace() only if the shape has never been seen
+	def get_polygons(self, chunk, trace):
+		key, left, top = self.get_key(chunk)
+
+		shape = self.load(key)
+		if shape != None:
+			self.hits += 1
+		else:
+			self.misses += 1
+			shape = [[(x - left, y - top) for x, y in polygon] for polygon in trace()]
+			self.save(key, shape)
+
+		return [[(x + left, y + top) for x, y in polygon] for polygon in shape]
+
+	# key: hash of the pixels moved to the top-left corner, listed top-down left-to-right
+	def get_key(self, chunk):
+		left = min([p[0] for p in chunk])
+		top = min([p[1] for p in chunk])
+		pixels = sorted([(x - left, y - top) for x, y in chunk], key=lambda p:(p[1], p[0]))
+		encoded = ";".join([f"{x},{y}" for x, y in pixels])
+		return (hashlib.sha1(encoded.encode("ascii")).hexdigest(), left, top)
+
+	def load(self, key):
+		if key in self.shapes:
+			self.shapes.move_to_end(key)
+			return self.shapes[key]
+
+		if self.cache_dir == None:
+			return None
+
+		filename = os.path.join(self.cache_dir, f"{key}.json")
+		if not os.path.isfile(filename):
+			return None
+
+		# a broken file counts as a miss, it gets written again after tracing
+		try:
+			with open(filename) as cache_file:
+				shape = [[(x, y) for x, y in polygon] for polygon in json.load(cache_file)]
+		except (ValueError, TypeError, OSError):
+			return None
+		self.remember(key, shape)
+		return shape
+
+	def save(self, key, shape):
+		self.remember(key, shape)
+
+		if self.cache_dir == None:
+			return
+
+		# write to a temp file first, so other runs never read half a file
+		# a folder that can't be written to (read-only, full disk) only means the shape is not kept on disk
+		filename = os.path.join(self.cache_dir, f"{key}.json")
+		temp_filename = f"{filename}.{os.getpid()}.tmp"
+		try:
+			with open(temp_filename, "w") as cache_file:
+				json.dump(shape, cache_file, separators=(",", ":"))
+			os.replace(temp_filename, filename)
+		except OSError:
+			if os.path.isfile(temp_filename):
+				try:
+					os.remove(temp_filename)
+				except OSError:
+					pass
+
+	# keep in memory, dropping the least recently used shape when full
+	def remember(self, key, shape):
+		self.shapes[key] = shape
+		self.shapes.move_to_end(key)
+		while len(self.shapes) > self.max_size:
+			self.shapes.popitem(last=False)
+
+	def get_hit_rate(self):
+		total = self.hits + self.misses
+		return self.hits / total if total else 0
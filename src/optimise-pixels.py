@@ -1,5 +1,7 @@
 # workflow:
 # - extract all pixel blocks (1x1 rect) from SVG
+#    - if the art is upscaled (e.g. every pixel is a 10x10 rect), scale it down to 1x1 pixels first
+#      and scale the shapes back up at the end (see PixelGrid)
 # - group them by colour (this is for performance optimisation)
 # - detect boundaries and separate into chunks
 # - plot chunk edges
@@ -11,19 +13,99 @@
 #       - write SVG path
 # - sort svg tags by "x" and "y" coordinates
 # - enclose with SVG opening/closing tags
+# - write back to file (gzipped if the input was .svgz / .svg.gz, or with --gzip)
+#
+# with --layered, colours are painted largest first, and holes that get painted over
+# by the colours after it are filled up (only if that makes the output smaller)
+#
+# with --planar, the chunk edges of all colours are found in one scan of the canvas (see PlanarMap)
+# instead of one EdgeMap per chunk
+#
+# traced shapes are remembered (see ShapeCache), so a shape that shows up again
+# at another spot, in another colour or in another file is not traced again
+#
+# with --frames, the files are frames of an animation: only the chunks around the pixels
+# that changed from the last frame are traced again
 
 import sys
 import os.path
 import xml.etree.ElementTree as ET 
 import re
+import gzip
+import argparse
 from EdgeMap import EdgeMap
 import SVGhelper as SVG
+import Layering
+from PlanarMap import PlanarMap
+from ShapeCache import ShapeCache
+import PixelGrid
+from fractions import Fraction
 
 def main():
-	filename = get_filename()
-	tree = ET.parse(filename)
+	args = get_arguments()
+	filenames = args.filenames if len(args.filenames) else [None]
+	filenames = [get_filename(filename) for filename in filenames]
+
+	# traced shapes are shared between all the files
+	shape_cache = None
+	if args.cache_size > 0:
+		shape_cache = ShapeCache(args.cache_size, args.cache_dir)
+
+	if args.frames:
+		optimise_frames(filenames, args, shape_cache)
+	else:
+		for filename in filenames:
+			optimise(filename, args, shape_cache)
+
+	if args.stats and shape_cache != None:
+		print(f"shape cache: {shape_cache.hits} hits, {shape_cache.misses} misses ({shape_cache.get_hit_rate():.1%} hit rate)", file=sys.stderr)
+
+
+def optimise(filename, args, shape_cache = None):
+	rects, view_box = read_rects(filename)
+	grid = PixelGrid.detect_grid(rects)
+	pixels = PixelGrid.get_pixels(rects, grid)
+	pixel_groups = get_pixel_groups(pixels)
+	traced = trace_pixel_groups(pixel_groups, args, shape_cache)
+
+	edge_maps = {}
+	for colour in traced:
+		edge_maps[colour] = [scale_chunk(polygons, grid) for chunk, polygons in traced[colour]]
+
+		# sort the chunks by y then x (to appear nicely in svg)
+		edge_maps[colour].sort(key=get_chunk_order)
+
+	"""
+	current state:
+		edge_maps = {
+			"#XXXXXX": [                                                                                   # a colour group
+				[                                                                                          # a chunk with a hole
+					{ left:int, top:int, width:int, height:int, points:array<tuple (x,y)>},                # a polygon
+					{ left:int, top:int, width:int, height:int, points:array<tuple (x,y)>}                 # a hole polygon
+				],
+				[                                                                                          # another chunk
+					{ left:int, top:int, width:int, height:int, points:array<tuple (x,y)>}                 # a polygon
+				]
+			]
+		}
+	"""
+
+	tags = list()
+	for colour in edge_maps:
+		for chunk in edge_maps[colour]:
+			tags.append(get_svg_tag(chunk, colour))
+
+	svg_content = get_svg_content(tags, view_box)
+	print(svg_content)
+	save_svg(filename, svg_content, args)
+
+
+# returns the rects as (x, y, width, height, colour) and the viewbox
+def read_rects(filename):
+	with open_svg(filename) as svg_file:
+		tree = ET.parse(svg_file)
 	root = tree.getroot()
-	pixel_groups = {}
+	rects = []
 
 	# recycle viewbox if possible
 	root_attr = root.attrib
@@ -57,8 +139,12 @@ def main():
 
 	for item in root.findall(".//svg:rect", ns_array):
 		attr = item.attrib
-		x = int(attr["x"] if "x" in attr else 0)
-		y = int(attr["y"] if "y" in attr else 0)
+		x = Fraction(attr["x"] if "x" in attr else 0)
+		y = Fraction(attr["y"] if "y" in attr else 0)
+		width = Fraction(attr["width"] if "width" in attr else 1)
+		height = Fraction(attr["height"] if "height" in attr else 1)
+		if width <= 0 or height <= 0:
+			continue
 
 		colour = None
 		if "fill" in attr:
@@ -72,74 +158,270 @@ def main():
 		if colour == None:
 			continue
 
+		rects.append((x, y, width, height, colour))
+
+	return (rects, view_box)
+
+
+# group by colour, in the order the colours first show up top-down left-to-right
+# so that the output doesn't depend on the order of the rects in the input
+# then split each colour into chunks
+def get_pixel_groups(pixels):
+	pixel_groups = {}
+	for pixel in sorted(pixels, key=lambda p:(p[1], p[0])):
+		colour = pixels[pixel]
 		if not colour in pixel_groups:
 			pixel_groups[colour] = set()
-		pixel_groups[colour].add((x, y))
+		pixel_groups[colour].add(pixel)
 
 	# convert PixelBanks to chunks of pixels
 	for colour in pixel_groups:
 		pixel_groups[colour] = group_pixels(pixel_groups[colour])
 
+	return pixel_groups
+
+
+# trace every chunk, returns { colour: [(chunk, polygons), ...] }
+def trace_pixel_groups(pixel_groups, args, shape_cache = None):
+	# layered mode: reorder colours so the largest is painted first
+	colours = list(pixel_groups)
+	if args.layered:
+		colours = Layering.get_layer_order(pixel_groups)
+		covered = Layering.get_covered_pixels(pixel_groups, colours)
+
+	# planar mode: find the edges of all chunks at once
+	if args.planar:
+		planar_map = PlanarMap(pixel_groups)
+
 	# setup edge map
-	edge_maps = {}
-	for colour in pixel_groups:
-		edge_maps[colour] = list()
+	traced = {}
+	for colour in colours:
+		traced[colour] = list()
 
-		for chunk in pixel_groups[colour]:
+		for index, chunk in enumerate(pixel_groups[colour]):
 			# here we will get a list of paths
-			edge_map = EdgeMap(chunk)
-			polygons = edge_map.generate_polygon()
+			if args.planar:
+				polygons = trace_chunk(chunk, planar_map.get_edge_map(colour, index), shape_cache)
+			else:
+				polygons = trace_chunk(chunk, shape_cache=shape_cache)
 
-			# precalculate left, top, width, height of the path
-			polygons = list(map(lambda polygon: precalculate(polygon), polygons))
-			edge_maps[colour].append(polygons)
+			# fill up the holes that will be painted over anyway
+			# but only keep it if it's really cheaper
+			if args.layered:
+				filled = Layering.fill_covered_holes(chunk, covered[colour])
+				if filled != None:
+					if args.planar:
+						filled_polygons = trace_chunk(filled, planar_map.get_filled_edge_map(colour, index, filled), shape_cache)
+					else:
+						filled_polygons = trace_chunk(filled, shape_cache=shape_cache)
+					if is_cheaper(filled_polygons, polygons, colour):
+						polygons = filled_polygons
 
-		# sort the chunks by y then x (to appear nicely in svg)
-		edge_maps[colour].sort(key=lambda chunk:min([polygon["left"] for polygon in chunk]))
-		edge_maps[colour].sort(key=lambda chunk:min([polygon["top"] for polygon in chunk]))
+			traced[colour].append((chunk, polygons))
 
-	"""
-	current state:
-		edge_maps = {
-			"#XXXXXX": [                                                                                   # a colour group
-				[                                                                                          # a chunk with a hole
-					{ left:int, top:int, width:int, height:int, points:array<tuple (x,y)>},                # a polygon
-					{ left:int, top:int, width:int, height:int, points:array<tuple (x,y)>}                 # a hole polygon
-				],
-				[                                                                                          # another chunk
-					{ left:int, top:int, width:int, height:int, points:array<tuple (x,y)>}                 # a polygon
-				]
-			]
-		}
-	"""
+	return traced
 
-	tags = list()
-	for colour in edge_maps:
-		for chunk in edge_maps[colour]:
-			# if chunk is a rectangle, convert to <rect />
-			if len(chunk) == 1 and is_rect(chunk[0]["points"]):
-				tag = SVG.get_svg_rect(**chunk[0], colour=colour)
 
-			# otherwise, convert to <path />
-			else:
-				tag = SVG.get_svg_path(chunk, colour)
+# by y then x, then by the points, so chunks at the same spot never swap places
+def get_chunk_order(chunk):
+	return (
+		min([polygon["top"] for polygon in chunk]),
+		min([polygon["left"] for polygon in chunk]),
+		[polygon["points"] for polygon in chunk]
+	)
 
-			tags.append(tag)
 
+def get_svg_content(tags, view_box):
 	svg_content = f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="{view_box}">\n'
 	for tag in tags:
 		svg_content += f"\t{tag}\n"
 	svg_content += "</svg>"
+	return svg_content
+
+
+# overwrite file
+# compressed input stays compressed, plain input only gets compressed on request
+def save_svg(filename, svg_content, args):
+	if is_gzip_filename(filename) or args.gzip:
+		write_svg(get_gzip_filename(filename), svg_content, args.gzip_level)
+	else:
+		write_svg(filename, svg_content)
+
+
+# Animation frames
+# only the first frame goes through the whole process
+# for the frames after it, only the chunks touched by the changed pixels are traced again
+# and the rest are carried over as they are
+def optimise_frames(filenames, args, shape_cache = None):
+	chunks = {}     # chunk id: { colour, pixels, first, order, tag }
+	chunk_of = {}   # (x, y): chunk id
+	frames = []     # chunk ids of each frame
+	view_boxes = []
+
+	# all the frames have to be on the same grid
+	frame_rects = []
+	for filename in filenames:
+		rects, view_box = read_rects(filename)
+		frame_rects.append(rects)
+		view_boxes.append(view_box)
+	grid = PixelGrid.detect_grid([rect for rects in frame_rects for rect in rects])
+
+	last_pixels = {}
+	for frame, rects in enumerate(frame_rects):
+		pixels = PixelGrid.get_pixels(rects, grid)
+
+		if frame == 0:
+			traced = trace_pixel_groups(get_pixel_groups(pixels), args, shape_cache)
+			for colour in traced:
+				for chunk, polygons in traced[colour]:
+					add_frame_chunk(chunks, chunk_of, colour, chunk, polygons, grid)
+			changed = pixels
+		else:
+			changed = update_frame_chunks(chunks, chunk_of, last_pixels, pixels, grid, shape_cache)
+
+		if args.stats:
+			print(f"frame {frame + 1}: {len(changed)} pixels changed", file=sys.stderr)
+
+		frames.append(get_frame_order(chunks, set(chunk_of.values())))
+		last_pixels = pixels
+
+	# one svg per frame
+	if args.output == None:
+		for frame, filename in enumerate(filenames):
+			svg_content = get_svg_content([chunks[chunk_id]["tag"] for chunk_id in frames[frame]], view_boxes[frame])
+			print(svg_content)
+			save_svg(filename, svg_content, args)
+		return
+
+	# a single svg with a <g /> per frame
+	# tags that show up in more than 1 frame go to <defs /> and are drawn with <use />
+	# (by the tag itself, so a frame going back to an earlier look is shared too)
+	frame_tags = [[chunks[chunk_id]["tag"] for chunk_id in chunk_ids] for chunk_ids in frames]
+	usage = {}
+	for tags in frame_tags:
+		for tag in set(tags):
+			usage[tag] = usage.get(tag, 0) + 1
+
+	shared = {}
+	for tags in frame_tags:
+		for tag in tags:
+			if usage[tag] > 1 and tag not in shared:
+				shared[tag] = f"s{len(shared)}"
+
+	# xlink:href for SVG 1.1 renderers, href for SVG 2
+	svg_content = f'<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" viewBox="{view_boxes[0]}">\n'
+	if len(shared):
+		svg_content += "\t<defs>\n"
+		for tag in shared:
+			svg_content += f"\t\t{SVG.set_tag_id(tag, shared[tag])}\n"
+		svg_content += "\t</defs>\n"
+
+	for frame, tags in enumerate(frame_tags):
+		# only the first frame is shown, the rest are left for the animation to switch on
+		display = "" if frame == 0 else ' display="none"'
+		svg_content += f'\t<g id="frame-{frame + 1}"{display}>\n'
+		for tag in tags:
+			if tag in shared:
+				svg_content += f'\t\t<use href="#{shared[tag]}" xlink:href="#{shared[tag]}"/>\n'
+			else:
+				svg_content += f"\t\t{tag}\n"
+		svg_content += "\t</g>\n"
+	svg_content += "</svg>"
+
 	print(svg_content)
+	save_svg(args.output, svg_content, args)
+
+
+def add_frame_chunk(chunks, chunk_of, colour, chunk, polygons, grid):
+	chunk_id = len(chunks)
+	chunks[chunk_id] = {
+		"colour": colour,
+		"pixels": chunk,
+		"first": min([(p[1], p[0]) for p in chunk]),
+		"order": get_chunk_order(polygons),
+		"tag": get_svg_tag(scale_chunk(polygons, grid), colour)
+	}
+	for pixel in chunk:
+		chunk_of[pixel] = chunk_id
+
 
-	# overwrite file
-	svg_rewrite = open(filename, "w")
-	svg_rewrite.write(svg_content)
+# re-trace the chunks around the pixels that changed since the last frame
+# returns the changed pixels
+def update_frame_chunks(chunks, chunk_of, last_pixels, pixels, grid, shape_cache = None):
+	changed = [p for p in set(last_pixels) | set(pixels) if last_pixels.get(p) != pixels.get(p)]
 
+	# a changed pixel breaks the chunk it was in,
+	# and may join up with the chunks of its new colour next to it
+	affected = set()
+	for pixel in changed:
+		if pixel in chunk_of:
+			affected.add(chunk_of[pixel])
 
-def get_filename():
-	filename = sys.argv[1] if len(sys.argv) == 2 else input("File name? ")
-	if not filename.endswith(".svg"):
+		colour = pixels.get(pixel)
+		if colour == None:
+			continue
+		x, y = pixel
+		for neighbour in [(x-1, y), (x+1, y), (x, y-1), (x, y+1)]:
+			if neighbour in chunk_of and chunks[chunk_of[neighbour]]["colour"] == colour:
+				affected.add(chunk_of[neighbour])
+
+	# pick up what's left of the affected chunks along with the changed pixels
+	regrouped = {}
+	for chunk_id in affected:
+		for pixel in chunks[chunk_id]["pixels"]:
+			del chunk_of[pixel]
+			if pixel in pixels:
+				regrouped.setdefault(pixels[pixel], set()).add(pixel)
+	for pixel in changed:
+		if pixel in pixels:
+			regrouped.setdefault(pixels[pixel], set()).add(pixel)
+
+	# stale chunks are left in the chunks dict, earlier frames may still be using them
+	for colour in sorted(regrouped):
+		for chunk in group_pixels(regrouped[colour]):
+			add_frame_chunk(chunks, chunk_of, colour, chunk, trace_chunk(chunk, shape_cache=shape_cache), grid)
+
+	return changed
+
+
+# same order as optimise(): colours in the order they first show up, then chunks by y then x
+def get_frame_order(chunks, chunk_ids):
+	first = {}
+	for chunk_id in chunk_ids:
+		colour = chunks[chunk_id]["colour"]
+		first[colour] = min(first.get(colour, chunks[chunk_id]["first"]), chunks[chunk_id]["first"])
+	return sorted(chunk_ids, key=lambda chunk_id:(first[chunks[chunk_id]["colour"]], chunks[chunk_id]["order"]))
+
+
+def get_arguments():
+	parser = argparse.ArgumentParser(description="Optimise pixel art SVG made of 1x1 <rect /> into paths")
+	parser.add_argument("filenames", nargs="*", metavar="filename", help="svg, svgz or svg.gz files to optimise")
+	parser.add_argument("-z", "--gzip", action="store_true", help="write gzipped output (.svgz)")
+	parser.add_argument("--gzip-level", type=int, default=9, choices=range(1, 10), metavar="1-9", help="gzip compression level (default: 9)")
+	parser.add_argument("--planar", action="store_true", help="find the edges of all colours in a single pass over the canvas")
+	parser.add_argument("--layered", action="store_true", help="paint the largest colour first and let the other colours cover its holes")
+	parser.add_argument("--cache-size", type=int, default=4096, help="number of traced shapes to keep in memory, 0 to disable (default: 4096)")
+	parser.add_argument("--cache-dir", help="also keep traced shapes in this folder, to reuse them in later runs")
+	parser.add_argument("--frames", action="store_true", help="treat the files as animation frames, in order, and only re-trace what changed between them")
+	parser.add_argument("-o", "--output", help="with --frames, write all frames into this one svg instead of overwriting each frame")
+	parser.add_argument("--stats", action="store_true", help="print the shape cache hit rate (and pixels changed per frame) to stderr")
+	args = parser.parse_args()
+
+	if args.output != None and not args.frames:
+		parser.error("--output only works with --frames")
+
+	# same as the input files, "anim" -> "anim.svg"
+	if args.output != None and not args.output.endswith(".svg") and not is_gzip_filename(args.output):
+		args.output = args.output + ".svg"
+	if args.frames and args.layered:
+		parser.error("--layered can't be used with --frames")
+	return args
+
+
+def get_filename(filename = None):
+	if filename == None:
+		filename = input("File name? ")
+	if not filename.endswith(".svg") and not is_gzip_filename(filename):
 		filename = filename + ".svg"
 	
 	if not os.path.isfile(filename):
@@ -149,6 +431,89 @@ def get_filename():
 	return filename
 
 
+def is_gzip_filename(filename):
+	return filename.endswith(".svgz") or filename.endswith(".svg.gz")
+
+
+# "icon.svg" -> "icon.svgz", "icon" -> "icon.svgz", compressed names are kept as they are
+def get_gzip_filename(filename):
+	if is_gzip_filename(filename):
+		return filename
+	if filename.endswith(".svg"):
+		filename = filename[:-len(".svg")]
+	return filename + ".svgz"
+
+
+# returns a binary stream of the svg, decompressing on the fly if it's gzipped
+# (sniff the magic bytes instead of trusting the extension)
+def open_svg(filename):
+	with open(filename, "rb") as svg_file:
+		magic = svg_file.read(2)
+	if magic == b"\x1f\x8b":
+		return gzip.open(filename, "rb")
+	return open(filename, "rb")
+
+
+# mtime=0 and an empty embedded filename keep the gzip header reproducible
+def write_svg(filename, svg_content, compress_level = None):
+	with open(filename, "wb") as svg_file:
+		if compress_level == None:
+			svg_file.write(svg_content.encode("utf-8"))
+			return
+
+		with gzip.GzipFile(filename="", mode="wb", fileobj=svg_file, compresslevel=compress_level, mtime=0) as gzip_file:
+			gzip_file.write(svg_content.encode("utf-8"))
+
+
+# here we will get a list of paths, with left, top, width, height precalculated
+# the edge map is only built when the shape is not in the cache
+def trace_chunk(chunk, edge_map = None, shape_cache = None):
+	trace = lambda: (edge_map if edge_map != None else EdgeMap(chunk)).generate_polygon()
+	if shape_cache != None:
+		polygons = shape_cache.get_polygons(chunk, trace)
+	else:
+		polygons = trace()
+	return list(map(lambda polygon: precalculate(polygon), polygons))
+
+
+# logical pixels back to the size and position they were drawn at
+def scale_chunk(chunk, grid):
+	if PixelGrid.is_unit_grid(grid):
+		return chunk
+
+	scaled = []
+	for polygon in chunk:
+		polygon = precalculate(PixelGrid.scale_polygon(polygon["points"], grid))
+		polygon["points"] = [(PixelGrid.to_number(x), PixelGrid.to_number(y)) for x, y in polygon["points"]]
+		for key in ["left", "top", "width", "height"]:
+			polygon[key] = PixelGrid.to_number(polygon[key])
+		scaled.append(polygon)
+	return scaled
+
+
+def get_svg_tag(chunk, colour):
+	# if chunk is a rectangle, convert to <rect />
+	if len(chunk) == 1 and is_rect(chunk[0]["points"]):
+		return SVG.get_svg_rect(**chunk[0], colour=colour)
+
+	# otherwise, convert to <path />
+	return SVG.get_svg_path(chunk, colour)
+
+
+# cost of a chunk = (bytes of the tag, number of vertices)
+# get_svg_path() flips the cutouts in place, so render a copy
+def get_chunk_cost(chunk, colour):
+	chunk = [dict(polygon, points=list(polygon["points"])) for polygon in chunk]
+	vertices = sum([len(simplify(polygon["points"])) for polygon in chunk])
+	return (len(get_svg_tag(chunk, colour)), vertices)
+
+
+def is_cheaper(chunk, than_chunk, colour):
+	size, vertices = get_chunk_cost(chunk, colour)
+	than_size, than_vertices = get_chunk_cost(than_chunk, colour)
+	return size < than_size and vertices < than_vertices
+
+
 def precalculate(polygon):
 	x = [p[0] for p in polygon]
 	y = [p[1] for p in polygon]
@@ -161,9 +526,8 @@ def precalculate(polygon):
 	}
 
 
-# first, remove unnecessary points (middle points in a straight line)
-# then check whether are there only 4 points left
-def is_rect(polygon):
+# remove unnecessary points (middle points in a straight line)
+def simplify(polygon):
 	optimised = []
 	last_point = polygon[-1]
 	for i in range(len(polygon)):
@@ -176,7 +540,13 @@ def is_rect(polygon):
 		optimised.append(polygon[i])
 		last_point = this_point
 	
-	return len(optimised) == 4
+	return optimised
+
+
+# first, remove unnecessary points
+# then check whether are there only 4 points left
+def is_rect(polygon):
+	return len(simplify(polygon)) == 4
 
 
 # This function splits the pixels into chunks
@@ -184,9 +554,14 @@ def group_pixels(pixels):
 	groups = []
 
 	# loop until all pixels are processed
-	while len(pixels):
-		# pop a random pixel then start flooding to all edges
-		frontier = [pixels.pop()]
+	# seeding top-down left-to-right, so the chunks come out in the same order every time
+	for seed in sorted(pixels, key=lambda p:(p[1], p[0])):
+		if seed not in pixels:
+			continue
+
+		# take the pixel then start flooding to all edges
+		pixels.remove(seed)
+		frontier = [seed]
 		group = set()
 
 		# I'm using a queue here because BFS feels more like 'flooding'
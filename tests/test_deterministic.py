@@ -0,0 +1,78 @@
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXAMPLE = os.path.join(ROOT, "example", "before.svg")
+SCRIPTS = {
+	"root": os.path.join(ROOT, "optimise-pixels.py"),
+	"src": os.path.join(ROOT, "src", "optimise-pixels.py"),
+}
+
+
+# shuffling the <rect /> in the input should never change a single byte of the output
+class TestDeterministic(unittest.TestCase):
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+		with open(EXAMPLE) as svg_file:
+			self.svg = svg_file.read()
+
+	def tearDown(self):
+		shutil.rmtree(self.folder)
+
+	def shuffled(self, seed):
+		rects = re.findall(r"<rect [^>]*/>", self.svg)
+		random.Random(seed).shuffle(rects)
+		parts = re.split(r"<rect [^>]*/>", self.svg)
+		svg = parts[0]
+		for rect, part in zip(rects, parts[1:]):
+			svg += rect + part
+		return svg
+
+	def optimise(self, script, svg, options = []):
+		filename = os.path.join(self.folder, "pixels.svg")
+		with open(filename, "w") as svg_file:
+			svg_file.write(svg)
+		subprocess.run([sys.executable, script] + options + [filename], check=True, stdout=subprocess.DEVNULL)
+		with open(filename, "rb") as svg_file:
+			return svg_file.read()
+
+	def assert_stable(self, script, options = []):
+		expected = self.optimise(script, self.svg, options)
+		for seed in range(5):
+			with self.subTest(seed=seed):
+				self.assertEqual(self.optimise(script, self.shuffled(seed), options), expected)
+
+	def test_root_script(self):
+		self.assert_stable(SCRIPTS["root"])
+
+	def test_src_script(self):
+		self.assert_stable(SCRIPTS["src"])
+
+	def test_src_script_planar(self):
+		self.assert_stable(SCRIPTS["src"], ["--planar"])
+
+	def test_planar_matches_default(self):
+		self.assertEqual(self.optimise(SCRIPTS["src"], self.svg, ["--planar"]), self.optimise(SCRIPTS["src"], self.svg))
+
+	def test_planar_layered_matches_layered(self):
+		self.assertEqual(self.optimise(SCRIPTS["src"], self.svg, ["--layered", "--planar"]), self.optimise(SCRIPTS["src"], self.svg, ["--layered"]))
+
+	def test_matches_example(self):
+		with open(os.path.join(ROOT, "example", "after.svg"), "rb") as svg_file:
+			expected = svg_file.read()
+		for name in SCRIPTS:
+			with self.subTest(script=name):
+				self.assertEqual(self.optimise(SCRIPTS[name], self.shuffled(0)), expected)
+
+	def test_shuffle_changes_input(self):
+		self.assertNotEqual(self.shuffled(0), self.svg)
+
+
+if __name__ == "__main__":
+	unittest.main()
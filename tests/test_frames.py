@@ -0,0 +1,163 @@
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+import xml.etree.ElementTree as ET
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, "src", "optimise-pixels.py")
+SIZE = 12
+COLOURS = ["#F92F3C", "#DA2934", "#9C5F00"]
+SVG_NS = "{http://www.w3.org/2000/svg}"
+XLINK_HREF = "{http://www.w3.org/1999/xlink}href"
+
+
+# frames of a sprite: a random image, then a few pixels changed per frame
+# the last frame goes back to the first one
+def get_frames(seed, count = 5):
+	generator = random.Random(seed)
+	pixels = {}
+	for y in range(SIZE):
+		for x in range(SIZE):
+			if generator.random() < 0.8:
+				pixels[(x, y)] = generator.choice(COLOURS)
+
+	frames = [dict(pixels)]
+	for frame in range(count - 2):
+		for change in range(generator.randint(1, 4)):
+			pixel = (generator.randrange(SIZE), generator.randrange(SIZE))
+			colour = generator.choice(COLOURS + [None])
+			if colour == None:
+				pixels.pop(pixel, None)
+			else:
+				pixels[pixel] = colour
+		frames.append(dict(pixels))
+	frames.append(dict(frames[0]))
+	return frames
+
+
+def get_svg(pixels):
+	svg = f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {SIZE} {SIZE}">\n'
+	for (x, y), colour in pixels.items():
+		svg += f'<rect x="{x}" y="{y}" fill="{colour}" width="1" height="1"/>\n'
+	return svg + "</svg>"
+
+
+# paths only use M, H, V and z
+def get_rings(d):
+	rings = []
+	for subpath in d.split("z"):
+		ring = []
+		point = None
+		for command, value in re.findall(r"([MHV])([\d.,]+)", subpath):
+			if command == "M":
+				point = tuple(float(v) for v in value.split(","))
+			elif command == "H":
+				point = (float(value), point[1])
+			else:
+				point = (point[0], float(value))
+			ring.append(point)
+		if len(ring):
+			rings.append(ring)
+	return rings
+
+
+# nonzero fill rule, with a ray from the pixel centre to the right
+def is_inside(rings, x, y):
+	winding = 0
+	for ring in rings:
+		for i in range(len(ring)):
+			start, end = (ring[i], ring[(i+1) % len(ring)])
+			if start[0] == end[0] and start[0] > x and min(start[1], end[1]) <= y < max(start[1], end[1]):
+				winding += 1 if end[1] > start[1] else -1
+	return winding != 0
+
+
+# { (x, y): colour } of everything drawn in a <g />
+def render(group, defs):
+	pixels = {}
+	for item in group:
+		if item.tag == SVG_NS + "use":
+			href = item.attrib.get("href")
+			xlink_href = item.attrib.get(XLINK_HREF)
+			assert href == xlink_href, "<use /> needs both href and xlink:href"
+			item = defs[href[1:]]
+
+		attr = item.attrib
+		for y in range(SIZE):
+			for x in range(SIZE):
+				if item.tag == SVG_NS + "rect":
+					left, top = (float(attr["x"]), float(attr["y"]))
+					inside = left <= x < left + float(attr["width"]) and top <= y < top + float(attr["height"])
+				else:
+					inside = is_inside(get_rings(attr["d"]), x + 0.5, y + 0.5)
+				if inside:
+					pixels[(x, y)] = attr["fill"]
+	return pixels
+
+
+class TestFrames(unittest.TestCase):
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.folder)
+
+	def write_frames(self, frames, name):
+		filenames = []
+		for frame, pixels in enumerate(frames):
+			filename = os.path.join(self.folder, f"{name}-{frame}.svg")
+			with open(filename, "w") as svg_file:
+				svg_file.write(get_svg(pixels))
+			filenames.append(filename)
+		return filenames
+
+	def run_script(self, options):
+		subprocess.run([sys.executable, SCRIPT] + options, check=True, stdout=subprocess.DEVNULL)
+
+	def read(self, filename):
+		with open(filename, "rb") as svg_file:
+			return svg_file.read()
+
+	def test_frames_match_standalone(self):
+		for seed in range(3):
+			frames = get_frames(seed)
+			animated = self.write_frames(frames, f"animated{seed}")
+			standalone = self.write_frames(frames, f"standalone{seed}")
+
+			self.run_script(["--frames"] + animated)
+			for filename in standalone:
+				self.run_script([filename])
+
+			for frame in range(len(frames)):
+				with self.subTest(seed=seed, frame=frame):
+					self.assertEqual(self.read(animated[frame]), self.read(standalone[frame]))
+
+	def test_single_document(self):
+		for seed in range(3):
+			frames = get_frames(seed)
+			output = os.path.join(self.folder, f"anim{seed}")
+			self.run_script(["--frames", "-o", output] + self.write_frames(frames, f"frame{seed}"))
+
+			root = ET.parse(output + ".svg").getroot()
+			defs = {}
+			for item in root.iter():
+				if "id" in item.attrib:
+					defs[item.attrib["id"]] = item
+
+			for frame in range(len(frames)):
+				with self.subTest(seed=seed, frame=frame):
+					self.assertEqual(render(defs[f"frame-{frame + 1}"], defs), frames[frame])
+
+			# the last frame is the first one again, so it's drawn entirely from <defs />
+			with self.subTest(seed=seed, frame="last"):
+				last = defs[f"frame-{len(frames)}"]
+				self.assertTrue(all([item.tag == SVG_NS + "use" for item in last]))
+
+
+if __name__ == "__main__":
+	unittest.main()
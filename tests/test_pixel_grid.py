@@ -0,0 +1,85 @@
+import os
+import sys
+import unittest
+from fractions import Fraction
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+import PixelGrid
+
+
+def rect(x, y, width = 1, height = 1, colour = "#FF0000"):
+	return (Fraction(x), Fraction(y), Fraction(width), Fraction(height), colour)
+
+
+class TestPixelGrid(unittest.TestCase):
+	def test_unit_pixels(self):
+		rects = [rect(0, 0), rect(1, 0, colour="#00FF00"), rect(3, 2)]
+		grid = PixelGrid.detect_grid(rects)
+		self.assertTrue(PixelGrid.is_unit_grid(grid))
+		self.assertEqual(PixelGrid.get_pixels(rects, grid), {(0, 0): "#FF0000", (1, 0): "#00FF00", (3, 2): "#FF0000"})
+
+	def test_upscaled_rects(self):
+		rects = [rect(0, 0, 10, 10), rect(10, 0, 10, 10, "#00FF00"), rect(0, 10, 20, 10, "#0000FF")]
+		grid = PixelGrid.detect_grid(rects)
+		self.assertEqual(grid, (10, 0, 0))
+		self.assertEqual(PixelGrid.get_pixels(rects, grid), {
+			(0, 0): "#FF0000",
+			(1, 0): "#00FF00",
+			(0, 1): "#0000FF",
+			(1, 1): "#0000FF"
+		})
+		self.assertEqual(PixelGrid.scale_polygon([(0, 1), (2, 2)], grid), [(0, 10), (20, 20)])
+
+	def test_upscaled_with_offset(self):
+		rects = [rect(5, 3, 4, 4), rect(9, 3, 4, 4, "#00FF00")]
+		grid = PixelGrid.detect_grid(rects)
+		self.assertEqual(grid, (4, 1, 3))
+		self.assertEqual(PixelGrid.get_pixels(rects, grid), {(1, 0): "#FF0000", (2, 0): "#00FF00"})
+
+	def test_half_pixels(self):
+		rects = [rect(0, 0, "0.5", "0.5"), rect("0.5", 0, "0.5", "0.5", "#00FF00")]
+		grid = PixelGrid.detect_grid(rects)
+		self.assertEqual(grid, (Fraction(1, 2), 0, 0))
+		self.assertEqual(PixelGrid.get_pixels(rects, grid), {(0, 0): "#FF0000", (1, 0): "#00FF00"})
+
+	def test_half_offset(self):
+		rects = [rect("0.5", 0), rect("1.5", 0, colour="#00FF00"), rect("2.5", 0, colour="#0000FF"), rect("3.5", 0)]
+		grid = PixelGrid.detect_grid(rects)
+		self.assertEqual(grid, (1, Fraction(1, 2), 0))
+		self.assertEqual(PixelGrid.get_pixels(rects, grid), {
+			(0, 0): "#FF0000",
+			(1, 0): "#00FF00",
+			(2, 0): "#0000FF",
+			(3, 0): "#FF0000"
+		})
+		self.assertEqual(PixelGrid.scale_polygon([(0, 0), (4, 1)], grid), [(Fraction(1, 2), 0), (Fraction(9, 2), 1)])
+
+	# a slightly-off number shouldn't blow the grid up to 1/1000 pixels
+	def test_off_grid(self):
+		rects = [rect(0, 0), rect(1, 0, colour="#00FF00"), rect("2.001", 0)]
+		grid = PixelGrid.detect_grid(rects)
+		self.assertTrue(PixelGrid.is_unit_grid(grid))
+		self.assertEqual(PixelGrid.get_pixels(rects, grid), {(0, 0): "#FF0000", (1, 0): "#00FF00", (2, 0): "#FF0000"})
+
+	# off the grid and half a pixel out: no pixel may land on its neighbour
+	def test_off_grid_with_half_offset(self):
+		rects = [rect("0.5", 0), rect("1.5", 0, colour="#00FF00"), rect("2.5", 0, colour="#0000FF"), rect("3.501", 0)]
+		grid = PixelGrid.detect_grid(rects)
+		self.assertEqual(grid, (1, Fraction(1, 2), 0))
+		self.assertEqual(PixelGrid.get_pixels(rects, grid), {
+			(0, 0): "#FF0000",
+			(1, 0): "#00FF00",
+			(2, 0): "#0000FF",
+			(3, 0): "#FF0000"
+		})
+
+	def test_snap(self):
+		self.assertEqual([PixelGrid.snap(Fraction(v)) for v in ["0.5", "1.5", "2.5", "2.49", "-0.5"]], [1, 2, 3, 2, 0])
+
+	def test_to_number(self):
+		self.assertEqual(PixelGrid.to_number(Fraction(10)), 10)
+		self.assertEqual(PixelGrid.to_number(Fraction(5, 2)), 2.5)
+
+
+if __name__ == "__main__":
+	unittest.main()